@@ -0,0 +1,115 @@
+# bots.py
+import json
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from config import BOT_TOKEN, NEXT_BOT_LINK, BOTS_CONFIG
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# Stage3 audio list (11 ta)
+DEFAULT_STAGE3_AUDIO_FILES = [
+    "10-ASOS DARSLIGI.mp3",
+    "1-ASOS.mp3",
+    "2-ASOS-COVER.mp3",
+    "3-ASOS-COVER.mp3",
+    "4-ASOS.mp3",
+    "5-ASOS.mp3",
+    "6-ASOS.mp3",
+    "7-ASOS.mp3",
+    "8-ASOS.mp3",
+    "9-ASOS.mp3",
+    "10-ASOS-2.mp3",
+]
+
+
+# =========================
+# BOT PROFILE
+# har bir bot: token, kontent papkalari, keyingi bot
+# =========================
+@dataclass
+class BotProfile:
+    name: str
+    token: str
+    tenant: str = ""      # db dagi users.bot qiymati
+    stage2_dir: Path = BASE_DIR / "content" / "stage4"   # 2-bosqich material shu yerdan olinadi
+    stage3_dir: Path = BASE_DIR / "content" / "stage3"
+    stage3_audio: list[str] = field(default_factory=lambda: list(DEFAULT_STAGE3_AUDIO_FILES))
+    next_bot: str = ""    # shu processdagi keyingi bot nomi
+    next_link: str = ""   # yoki tashqi havola
+    link: str = ""        # https://t.me/<username>, startupda to'ldiriladi
+
+    @property
+    def bot_id(self) -> int:
+        return int(self.token.split(":", 1)[0])
+
+
+def _dir(raw: str | None, default: Path) -> Path:
+    if not raw:
+        return default
+    p = Path(raw)
+    return p if p.is_absolute() else BASE_DIR / p
+
+
+def load_profiles() -> list[BotProfile]:
+    if not BOTS_CONFIG:
+        # eski rejim: bitta bot, tenant ''
+        return [BotProfile(name="", token=BOT_TOKEN, tenant="", next_link=NEXT_BOT_LINK)]
+
+    raw = BOTS_CONFIG
+    if not raw.startswith("["):
+        raw = Path(raw).read_text(encoding="utf-8")
+
+    profiles = []
+    for i, item in enumerate(json.loads(raw)):
+        # Tenant: eski (bitta botli) bazadagi userlar tenant '' da turadi, shuning uchun
+        # birinchi bot standart bo'yicha '' ni oladi - mavjud userlar qayta ro'yxatdan o'tmaydi.
+        # Qolganlari - bot nomi. "tenant" kaliti bilan aniq berish mumkin.
+        p = BotProfile(
+            name=item["name"],
+            token=item["token"],
+            tenant=item.get("tenant", "" if i == 0 else item["name"]),
+            next_bot=item.get("next_bot", ""),
+            next_link=item.get("next_link", ""),
+        )
+        p.stage2_dir = _dir(item.get("stage2_dir"), p.stage2_dir)
+        p.stage3_dir = _dir(item.get("stage3_dir"), p.stage3_dir)
+        if item.get("stage3_audio"):
+            p.stage3_audio = list(item["stage3_audio"])
+        profiles.append(p)
+
+    names = [p.name for p in profiles]
+    if len(set(names)) != len(names):
+        raise ValueError("BOTS_CONFIG: bot nomlari takrorlanmasligi kerak")
+    for p in profiles:
+        if p.next_bot and p.next_bot not in names:
+            raise ValueError(f"BOTS_CONFIG: next_bot topilmadi: {p.next_bot}")
+    tenants = [p.tenant for p in profiles]
+    if len(set(tenants)) != len(tenants):
+        raise ValueError("BOTS_CONFIG: tenant lar takrorlanmasligi kerak")
+    return profiles
+
+
+PROFILES = load_profiles()
+BY_ID = {p.bot_id: p for p in PROFILES}
+BY_NAME = {p.name: p for p in PROFILES}
+
+# Joriy update qaysi botga tegishli (TenantMiddleware o'rnatadi)
+_current: ContextVar[BotProfile] = ContextVar("current_bot_profile", default=PROFILES[0])
+
+
+def set_current(profile: BotProfile):
+    return _current.set(profile)
+
+
+def reset_current(token):
+    _current.reset(token)
+
+
+def current() -> BotProfile:
+    return _current.get()
+
+
+def next_profile(profile: BotProfile) -> BotProfile | None:
+    return BY_NAME.get(profile.next_bot) if profile.next_bot else None
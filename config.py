@@ -9,3 +9,24 @@ _admins_raw = os.getenv("ADMIN_IDS", "").strip()
 ADMIN_IDS = []
 if _admins_raw:
     ADMIN_IDS = [int(x.strip()) for x in _admins_raw.split(",") if x.strip().isdigit()]
+
+# Update dedup (takroriy update_id larni tashlash)
+UPDATE_DEDUP_TTL = int(os.getenv("UPDATE_DEDUP_TTL", "600") or 600)
+UPDATE_DEDUP_MAX = int(os.getenv("UPDATE_DEDUP_MAX", "10000") or 10000)
+UPDATE_DEDUP_DB = os.getenv("UPDATE_DEDUP_DB", "").strip().lower() in {"1", "true", "yes"}
+
+# Bir nechta botni bitta processda ishlatish (ixtiyoriy).
+# JSON ro'yxat yoki JSON fayl yo'li, masalan:
+# [{"name": "s1", "token": "...", "next_bot": "s2"},
+#  {"name": "s2", "token": "...", "stage2_dir": "content/s2/stage4", "stage3_dir": "content/s2/stage3"}]
+# "tenant" - bazadagi users.bot qiymati: birinchi bot uchun standart '' (eski userlar shu yerda),
+# qolganlari uchun bot nomi.
+BOTS_CONFIG = os.getenv("BOTS_CONFIG", "").strip()
+
+# Write-behind journal (baza uzilganda yozuvlar shu faylga tushadi). Bo'sh - o'chiq.
+WRITE_JOURNAL_PATH = os.getenv("WRITE_JOURNAL_PATH", "").strip()
+DB_WRITE_TIMEOUT = float(os.getenv("DB_WRITE_TIMEOUT", "2") or 2)
+
+# Read-replica (admin / hisobot so'rovlari uchun). Bo'sh - hammasi primary da.
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL", "").strip()
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "30") or 30)
@@ -1,14 +1,48 @@
 # db.py
+import asyncio
 import asyncpg
 import secrets
+import time
+import traceback
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from journal import Journal
 
 _pool: asyncpg.Pool | None = None
 
+# Bitta processda bir nechta bot: har bir update o'z botining "tenant" i bilan ishlaydi.
+# Bitta bot bo'lsa tenant '' (eski bazalar o'zgarishsiz ishlaydi).
+_tenant: ContextVar[str] = ContextVar("db_tenant", default="")
+
+
+def set_tenant(name: str):
+    return _tenant.set(name)
+
+
+def reset_tenant(token):
+    _tenant.reset(token)
+
+
+def _t() -> str:
+    return _tenant.get()
+
 
-async def init(dsn: str):
-    global _pool
+async def init(
+    dsn: str,
+    journal_path: str = "",
+    write_timeout: float = 2.0,
+    replica_dsn: str = "",
+    replica_max_lag: float = 30.0,
+    on_dead_letter=None,
+):
+    global _pool, _journal, _replay_task, _write_timeout, _on_dead_letter
     _pool = await asyncpg.create_pool(dsn, min_size=1, max_size=5)
 
+    # Admin / hisobot o'qishlari uchun alohida pool (replika)
+    if replica_dsn:
+        await _init_replica(replica_dsn, replica_max_lag)
+
     async with _pool.acquire() as conn:
         # =========================
         # USERS (asosiy)
@@ -41,6 +75,39 @@ async def init(dsn: str):
         ALTER TABLE users ADD COLUMN IF NOT EXISTS stage3_idx INT DEFAULT 0;
         ALTER TABLE users ADD COLUMN IF NOT EXISTS stage3_waiting BOOLEAN DEFAULT FALSE;
         ALTER TABLE users ADD COLUMN IF NOT EXISTS stage3_completed BOOLEAN DEFAULT FALSE;
+
+        ALTER TABLE users ADD COLUMN IF NOT EXISTS bot TEXT NOT NULL DEFAULT '';
+        ALTER TABLE users ADD COLUMN IF NOT EXISTS handoff_from TEXT DEFAULT '';
+        ALTER TABLE users ADD COLUMN IF NOT EXISTS lang TEXT DEFAULT '';
+        """)
+
+        # keyset pagination (iter_users) uchun: created_at NULL bo'lmasin + index
+        # NULL larni to'ldirish bir marta: keyin ustun NOT NULL bo'ladi va
+        # keyingi startlarda jadval skan qilinmaydi
+        await conn.execute("""
+        DO $$
+        BEGIN
+            IF (SELECT is_nullable FROM information_schema.columns
+                WHERE table_name = 'users' AND column_name = 'created_at') = 'YES' THEN
+                UPDATE users SET created_at=NOW() WHERE created_at IS NULL;
+                ALTER TABLE users ALTER COLUMN created_at SET NOT NULL;
+            END IF;
+        END $$;
+        CREATE INDEX IF NOT EXISTS users_bot_created_idx ON users(bot, created_at, user_id);
+        """)
+
+        # =========================
+        # MIGRATION: PRIMARY KEY (user_id) -> (bot, user_id)
+        # bitta user har bir botda alohida progressga ega
+        # =========================
+        await conn.execute("""
+        DO $$
+        BEGIN
+            IF (SELECT array_length(conkey, 1) FROM pg_constraint WHERE conname = 'users_pkey') = 1 THEN
+                ALTER TABLE users DROP CONSTRAINT users_pkey;
+                ALTER TABLE users ADD PRIMARY KEY (bot, user_id);
+            END IF;
+        END $$;
         """)
 
         # =========================
@@ -53,17 +120,56 @@ async def init(dsn: str):
 
         await conn.execute("""
         CREATE TABLE stage3_notes (
+            bot TEXT NOT NULL DEFAULT '',
             user_id BIGINT NOT NULL,
             idx INT NOT NULL,
             note TEXT NOT NULL,
             created_at TIMESTAMP DEFAULT NOW(),
-            PRIMARY KEY(user_id, idx)
+            PRIMARY KEY(bot, user_id, idx)
+        );
+        """)
+
+        # =========================
+        # PROCESSED UPDATES (dedup, bir nechta worker uchun)
+        # =========================
+        await conn.execute("""
+        CREATE TABLE IF NOT EXISTS processed_updates (
+            bot_id BIGINT NOT NULL,
+            update_id BIGINT NOT NULL,
+            seen_at TIMESTAMP DEFAULT NOW(),
+            PRIMARY KEY(bot_id, update_id)
         );
+        CREATE INDEX IF NOT EXISTS processed_updates_seen_at_idx ON processed_updates(seen_at);
         """)
 
+    # Write-behind journal: oldingi ishga tushishdan qolgan yozuvlar overlay ga
+    if journal_path:
+        _write_timeout = write_timeout
+        _on_dead_letter = on_dead_letter
+        _journal = Journal(journal_path)
+        for entry in _journal.load():
+            _overlay_put(entry)
+        _replay_task = asyncio.create_task(_replay_loop())
+
 
 async def close():
-    global _pool
+    global _pool, _replay_task, _replica_pool, _replica_task
+    if _replica_task:
+        _replica_task.cancel()
+        _replica_task = None
+    if _replica_pool:
+        await _replica_pool.close()
+        _replica_pool = None
+    if _replay_task:
+        _replay_task.cancel()
+        _replay_task = None
+    if _journal and _journal.pending():
+        try:
+            await _replay_once()
+        except Exception:
+            pass  # keyingi ishga tushishda fayldan qayta yoziladi
+    if _journal:
+        _journal.close()
     if _pool:
         await _pool.close()
         _pool = None
@@ -75,99 +181,402 @@ def _p() -> asyncpg.Pool:
     return _pool
 
 
+# =========================
+# READ REPLICA
+# Og'ir admin/hisobot so'rovlari replikaga ketadi, user hot-path esa
+# (yozish ham, o'qish ham) faqat primary da qoladi. Replika ishlamasa yoki
+# kechikishi _replica_max_lag dan oshsa - primary ga qaytamiz.
+# =========================
+_replica_pool: asyncpg.Pool | None = None
+_replica_task: asyncio.Task | None = None
+_replica_max_lag = 30.0
+_REPLICA_TIMEOUT = 5.0
+_replica_lag: float | None = None   # None - replika holati noma'lum / ishlamayapti
+
+
+async def _init_replica(dsn: str, max_lag: float):
+    global _replica_pool, _replica_task, _replica_max_lag
+    _replica_max_lag = max_lag
+    # replika ixtiyoriy: ulanmasa (xato/osilib qolish) ham start to'xtamaydi,
+    # pool ni _replica_monitor keyinroq qayta yaratadi
+    try:
+        async with asyncio.timeout(_REPLICA_TIMEOUT):
+            _replica_pool = await asyncpg.create_pool(dsn, min_size=1, max_size=5)
+    except Exception:
+        traceback.print_exc()
+    _replica_task = asyncio.create_task(_replica_monitor(dsn))
+
+
+async def _replica_monitor(dsn: str):
+    global _replica_pool, _replica_lag
+    while True:
+        try:
+            if _replica_pool is None:
+                async with asyncio.timeout(_REPLICA_TIMEOUT):
+                    _replica_pool = await asyncpg.create_pool(dsn, min_size=1, max_size=5)
+            async with asyncio.timeout(5):
+                async with _replica_pool.acquire() as conn:
+                    # WAL hammasi qo'llangan bo'lsa kechikish 0 (primary bo'sh turganda ham)
+                    _replica_lag = float(await conn.fetchval("""
+                        SELECT CASE
+                            WHEN NOT pg_is_in_recovery() THEN 0
+                            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                            ELSE COALESCE(EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp()), 0)
+                        END
+                    """))
+        except _UNAVAILABLE:
+            _replica_lag = None
+        except Exception:
+            traceback.print_exc()
+            _replica_lag = None
+        await asyncio.sleep(10)
+
+
+def _replica_usable(max_lag: float | None = None) -> bool:
+    limit = _replica_max_lag if max_lag is None else max_lag
+    return _replica_pool is not None and _replica_lag is not None and _replica_lag <= limit
+
+
+async def _read(method: str, sql: str, *args, max_lag: float | None = None):
+    """Faqat o'qish uchun: replikada bajaradi, bo'lmasa primary da."""
+    global _replica_lag
+    if _replica_usable(max_lag):
+        try:
+            async with asyncio.timeout(_REPLICA_TIMEOUT):
+                async with _replica_pool.acquire() as conn:
+                    return await getattr(conn, method)(sql, *args)
+        except _UNAVAILABLE:
+            _replica_lag = None  # osilib qolgan/uzilgan: monitor tiklaguncha primary
+        except asyncpg.PostgresError:
+            # replikaga xos xatolar (masalan "conflict with recovery" -> QueryCanceledError):
+            # shu so'rov primary da qayta bajariladi; SQL xatosi bo'lsa u yerda ham chiqadi
+            pass
+    async with _p().acquire() as conn:
+        return await getattr(conn, method)(sql, *args)
+
+
+def replica_status() -> str:
+    if _replica_pool is None and _replica_task is None:
+        return "off"
+    if _replica_lag is None:
+        return "down"
+    return f"{_replica_lag:.1f}s"
+
+
+# =========================
+# WRITE-BEHIND JOURNAL
+# Baza sekin yoki ishlamasa user yozuvlari journal.py ga tushadi, o'qishlar
+# overlay dan beriladi, baza tiklangach yozuvlar tartib bilan qayta yoziladi.
+# Journal bo'sh bo'lmaguncha yangi yozuvlar ham journal orqali ketadi (tartib buzilmasin).
+# =========================
+_journal: Journal | None = None
+_replay_task: asyncio.Task | None = None
+_write_timeout = 2.0
+_REPLAY_BATCH = 200
+_DOWN_BACKOFF = 1.0
+_down_until = 0.0
+_on_dead_letter = None  # async (entry, error) -> None, masalan adminga xabar
+
+# (tenant, user_id) -> {ustun: (qiymat, seq)}
+_overlay: dict[tuple[str, int], dict[str, tuple]] = {}
+
+# Baza ishlamayotganini bildiruvchi xatolar (boshqa xatolar avvalgidek ko'tariladi)
+_UNAVAILABLE = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.InterfaceError,
+    asyncpg.CannotConnectNowError,
+    asyncpg.AdminShutdownError,           # 57P01: server to'xtatilmoqda / failover
+    asyncpg.ReadOnlySQLTransactionError,  # 25006: eski primary endi replika
+)
+
+_STAGE2_COLS = {
+    "text_done": "stage2_text_done",
+    "audio_done": "stage2_audio_done",
+    "video_done": "stage2_video_done",
+    "links_done": "stage2_links_done",
+}
+
+
+# journal orqali yoziladigan users ustunlari (SQL ga faqat shular qo'yiladi)
+_JOURNAL_FIELDS = {
+    "state", "full_name", "xj_id", "join_date_text", "phone", "level",
+    "stage3_idx", "stage3_waiting", "stage3_completed",
+}
+
+
+def _columns(op: str, kw: dict) -> dict:
+    """Operatsiya qaysi users ustunlarini qanday qiymatga o'zgartiradi."""
+    if op == "set_field":
+        if kw["field"] not in _JOURNAL_FIELDS:
+            raise ValueError("Invalid field")
+        return {kw["field"]: kw["value"]}
+    if op == "mark_stage2":
+        return {_STAGE2_COLS[kw["key"]]: True}
+    if op == "reset_stage2":
+        return {col: False for col in _STAGE2_COLS.values()}
+    if op in ("stage3_note", "handoff"):
+        return {}
+    raise ValueError(f"Unknown op: {op}")
+
+
+async def _apply(conn, tenant: str, op: str, user_id: int, kw: dict):
+    if op == "handoff":
+        # journal tartibida bajariladi: manba qatordagi oldingi yozuvlar allaqachon qo'llangan
+        await conn.execute(_HANDOFF_SQL, user_id, tenant, kw["to_bot"], kw["ref_code"], _PRE_REG_STATES)
+        return
+    if op == "stage3_note":
+        await conn.execute("""
+            INSERT INTO stage3_notes(user_id, idx, note, bot)
+            VALUES($1,$2,$3,$4)
+            ON CONFLICT(bot, user_id, idx)
+            DO UPDATE SET note=EXCLUDED.note, created_at=NOW()
+        """, user_id, kw["idx"], kw["note"], tenant)
+        return
+
+    cols = _columns(op, kw)
+    sets = ", ".join(f"{c}=${i + 3}" for i, c in enumerate(cols))
+    await conn.execute(
+        f"UPDATE users SET {sets} WHERE user_id=$1 AND bot=$2",
+        user_id, tenant, *cols.values()
+    )
+
+
+@asynccontextmanager
+async def _primary():
+    """User hot-path uchun primary ulanish. Journal yoqilgan bo'lsa o'qish ham, yozish ham
+    _write_timeout bilan chegaralanadi, baza uzilgandan keyin _DOWN_BACKOFF davomida
+    darhol xato beriladi (har so'rov timeout kutib qolmasin)."""
+    global _down_until
+    if _journal is None:
+        async with _p().acquire() as conn:
+            yield conn
+        return
+
+    if time.monotonic() < _down_until:
+        raise ConnectionError("DB unavailable")
+    try:
+        async with asyncio.timeout(_write_timeout):
+            async with _p().acquire() as conn:
+                yield conn
+    except _UNAVAILABLE:
+        _down_until = time.monotonic() + _DOWN_BACKOFF
+        raise
+
+
+async def _mutate(op: str, user_id: int, **kw):
+    tenant = _t()
+    if _journal is None or not _journal.pending():
+        try:
+            async with _primary() as conn:
+                return await _apply(conn, tenant, op, user_id, kw)
+        except _UNAVAILABLE:
+            if _journal is None:
+                raise
+            # journalga yozamiz (yozuvlar idempotent - qayta yozish xavfsiz)
+
+    # overlay await dan oldin: replay yozuvni bazaga yozib overlay dan tushirib
+    # yuborgandan keyin eski qiymat overlay da qolib ketmasin
+    entry = _journal.enqueue(tenant, op, user_id, kw)
+    _overlay_put(entry)
+    await _journal.flush()
+
+
+def _overlay_put(entry: dict):
+    cols = _columns(entry["op"], entry["kw"])
+    if not cols:
+        return
+    row = _overlay.setdefault((entry["t"], entry["u"]), {})
+    for c, v in cols.items():
+        row[c] = (v, entry["seq"])
+
+
+def _overlay_get(user_id: int) -> dict:
+    row = _overlay.get((_t(), user_id))
+    return {c: v for c, (v, _seq) in row.items()} if row else {}
+
+
+def _overlay_drop(upto_seq: int):
+    for key in list(_overlay):
+        row = _overlay[key]
+        for c in [c for c, (_v, seq) in row.items() if seq <= upto_seq]:
+            del row[c]
+        if not row:
+            del _overlay[key]
+
+
+async def _replay_once() -> int:
+    batch = _journal.peek(_REPLAY_BATCH)
+    if not batch:
+        return 0
+    try:
+        async with asyncio.timeout(_write_timeout * 5):
+            async with _p().acquire() as conn:
+                async with conn.transaction():
+                    for e in batch:
+                        await _apply(conn, e["t"], e["op"], e["u"], e["kw"])
+    except _UNAVAILABLE:
+        raise
+    except Exception:
+        # batchda bazaga yozib bo'lmaydigan yozuv bor: bittalab yozamiz,
+        # yiqilganini .dead ga chiqarib navbatni to'sib qo'ymaymiz
+        return await _replay_one_by_one(batch)
+    _overlay_drop(_journal.commit(len(batch)))
+    return len(batch)
+
+
+async def _replay_one_by_one(batch: list[dict]) -> int:
+    done = 0
+    try:
+        for e in batch:
+            try:
+                async with asyncio.timeout(_write_timeout):
+                    async with _p().acquire() as conn:
+                        await _apply(conn, e["t"], e["op"], e["u"], e["kw"])
+            except _UNAVAILABLE:
+                raise
+            except Exception as err:
+                await _dead_letter(e, f"{type(err).__name__}: {err}")
+            done += 1
+    finally:
+        _overlay_drop(_journal.commit(done))
+    return done
+
+
+async def _dead_letter(entry: dict, error: str):
+    _journal.dead_letter(entry, error)
+    print(f"⚠️ journal dead-letter seq={entry['seq']}: {error}")
+    if _on_dead_letter:
+        try:
+            await _on_dead_letter(entry, error)
+        except Exception:
+            traceback.print_exc()
+
+
+async def _replay_loop():
+    delay = 1.0
+    while True:
+        await asyncio.sleep(delay)
+        try:
+            while await _replay_once():
+                pass
+            delay = 1.0
+        except _UNAVAILABLE:
+            delay = min(delay * 2, 30.0)
+        except Exception:
+            traceback.print_exc()
+            delay = 30.0
+
+
+def journal_pending() -> int:
+    return _journal.pending() if _journal else 0
+
+
 # =========================
 # USERS
 # =========================
 async def ensure_user(user_id: int, inviter_id: int | None = None):
-    pool = _p()
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow("SELECT user_id FROM users WHERE user_id=$1", user_id)
+    async with _primary() as conn:
+        row = await conn.fetchrow("SELECT user_id FROM users WHERE user_id=$1 AND bot=$2", user_id, _t())
         if row:
             if inviter_id is not None:
                 await conn.execute(
-                    "UPDATE users SET inviter_id=COALESCE(inviter_id,$2) WHERE user_id=$1",
-                    user_id, inviter_id
+                    "UPDATE users SET inviter_id=COALESCE(inviter_id,$2) WHERE user_id=$1 AND bot=$3",
+                    user_id, inviter_id, _t()
                 )
             return
 
         ref_code = secrets.token_hex(4)
         await conn.execute(
-            "INSERT INTO users(user_id, inviter_id, ref_code) VALUES($1,$2,$3)",
-            user_id, inviter_id, ref_code
+            "INSERT INTO users(user_id, inviter_id, ref_code, bot) VALUES($1,$2,$3,$4)",
+            user_id, inviter_id, ref_code, _t()
         )
 
 
 async def get_user_id_by_ref_code(ref_code: str) -> int | None:
-    pool = _p()
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow("SELECT user_id FROM users WHERE ref_code=$1", ref_code)
+    async with _primary() as conn:
+        row = await conn.fetchrow("SELECT user_id FROM users WHERE ref_code=$1 AND bot=$2", ref_code, _t())
         return int(row["user_id"]) if row else None
 
 
 async def set_state(user_id: int, state: str):
-    pool = _p()
-    async with pool.acquire() as conn:
-        await conn.execute("UPDATE users SET state=$2 WHERE user_id=$1", user_id, state)
+    await _mutate("set_field", user_id, field="state", value=state)
 
 
 async def get_state(user_id: int) -> str:
-    pool = _p()
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow("SELECT state FROM users WHERE user_id=$1", user_id)
+    over = _overlay_get(user_id)
+    if "state" in over:
+        return over["state"]
+    async with _primary() as conn:
+        row = await conn.fetchrow("SELECT state FROM users WHERE user_id=$1 AND bot=$2", user_id, _t())
         return row["state"] if row else ""
 
 
 async def set_user_field(user_id: int, field: str, value: str):
     if field not in {"full_name", "xj_id", "join_date_text", "phone", "level"}:
         raise ValueError("Invalid field")
-    pool = _p()
-    async with pool.acquire() as conn:
-        await conn.execute(f"UPDATE users SET {field}=$2 WHERE user_id=$1", user_id, value)
+    await _mutate("set_field", user_id, field=field, value=value)
 
 
 async def get_user_profile(user_id: int) -> dict:
-    pool = _p()
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow("SELECT * FROM users WHERE user_id=$1", user_id)
-        return dict(row) if row else {}
+    over = _overlay_get(user_id)
+    try:
+        async with _primary() as conn:
+            row = await conn.fetchrow("SELECT * FROM users WHERE user_id=$1 AND bot=$2", user_id, _t())
+    except _UNAVAILABLE:
+        if not over:
+            raise
+        row = None
+    return {**(dict(row) if row else {}), **over}
+
+
+# =========================
+# LANG (har update da o'qiladi - xotirada kesh)
+# =========================
+_lang_cache: dict[tuple[str, int], str] = {}
+
+
+async def get_lang(user_id: int) -> str:
+    key = (_t(), user_id)
+    if key in _lang_cache:
+        return _lang_cache[key]
+    async with _primary() as conn:
+        row = await conn.fetchrow("SELECT lang FROM users WHERE user_id=$1 AND bot=$2", user_id, _t())
+    lang = (row["lang"] or "") if row else ""
+    if len(_lang_cache) > 100000:
+        _lang_cache.clear()
+    _lang_cache[key] = lang
+    return lang
+
+
+async def set_lang(user_id: int, lang: str):
+    async with _primary() as conn:
+        await conn.execute("UPDATE users SET lang=$2 WHERE user_id=$1 AND bot=$3", user_id, lang, _t())
+    _lang_cache[(_t(), user_id)] = lang
 
 
 # =========================
 # STAGE 2
 # =========================
 async def get_stage2(user_id: int) -> dict:
-    pool = _p()
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow("""
-            SELECT stage2_text_done, stage2_audio_done, stage2_video_done, stage2_links_done
-            FROM users WHERE user_id=$1
-        """, user_id)
-
-        if not row:
-            return {"text_done": False, "audio_done": False, "video_done": False, "links_done": False}
+    over = _overlay_get(user_id)
+    row = None
+    if not all(col in over for col in _STAGE2_COLS.values()):
+        async with _primary() as conn:
+            row = await conn.fetchrow("""
+                SELECT stage2_text_done, stage2_audio_done, stage2_video_done, stage2_links_done
+                FROM users WHERE user_id=$1 AND bot=$2
+            """, user_id, _t())
 
-        return {
-            "text_done": bool(row["stage2_text_done"]),
-            "audio_done": bool(row["stage2_audio_done"]),
-            "video_done": bool(row["stage2_video_done"]),
-            "links_done": bool(row["stage2_links_done"]),
-        }
+    merged = {**(dict(row) if row else {}), **over}
+    return {key: bool(merged.get(col)) for key, col in _STAGE2_COLS.items()}
 
 
 async def mark_stage2(user_id: int, key: str):
-    mapping = {
-        "text_done": "stage2_text_done",
-        "audio_done": "stage2_audio_done",
-        "video_done": "stage2_video_done",
-        "links_done": "stage2_links_done",
-    }
-    if key not in mapping:
+    if key not in _STAGE2_COLS:
         raise ValueError("Invalid stage2 key")
-
-    col = mapping[key]
-    pool = _p()
-    async with pool.acquire() as conn:
-        await conn.execute(f"UPDATE users SET {col}=TRUE WHERE user_id=$1", user_id)
+    await _mutate("mark_stage2", user_id, key=key)
 
 
 async def stage2_all_done(user_id: int) -> bool:
@@ -176,79 +585,254 @@ async def stage2_all_done(user_id: int) -> bool:
 
 
 async def reset_stage2(user_id: int):
-    pool = _p()
-    async with pool.acquire() as conn:
-        await conn.execute("""
-            UPDATE users SET
-                stage2_text_done=FALSE,
-                stage2_audio_done=FALSE,
-                stage2_video_done=FALSE,
-                stage2_links_done=FALSE
-            WHERE user_id=$1
-        """, user_id)
+    await _mutate("reset_stage2", user_id)
 
 
 # =========================
 # STAGE 3
 # =========================
 async def set_stage3_idx(user_id: int, idx: int):
-    pool = _p()
-    async with pool.acquire() as conn:
-        await conn.execute("UPDATE users SET stage3_idx=$2 WHERE user_id=$1", user_id, idx)
+    await _mutate("set_field", user_id, field="stage3_idx", value=idx)
 
 
 async def get_stage3_idx(user_id: int) -> int:
-    pool = _p()
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow("SELECT stage3_idx FROM users WHERE user_id=$1", user_id)
+    over = _overlay_get(user_id)
+    if "stage3_idx" in over:
+        return int(over["stage3_idx"])
+    async with _primary() as conn:
+        row = await conn.fetchrow("SELECT stage3_idx FROM users WHERE user_id=$1 AND bot=$2", user_id, _t())
         return int(row["stage3_idx"]) if row else 0
 
 
 async def set_stage3_waiting(user_id: int, waiting: bool):
-    pool = _p()
-    async with pool.acquire() as conn:
-        await conn.execute("UPDATE users SET stage3_waiting=$2 WHERE user_id=$1", user_id, waiting)
+    await _mutate("set_field", user_id, field="stage3_waiting", value=waiting)
 
 
 async def set_stage3_completed(user_id: int, completed: bool):
-    pool = _p()
-    async with pool.acquire() as conn:
-        await conn.execute("UPDATE users SET stage3_completed=$2 WHERE user_id=$1", user_id, completed)
+    await _mutate("set_field", user_id, field="stage3_completed", value=completed)
 
 
 async def save_stage3_note(user_id: int, idx: int, note: str):
+    await _mutate("stage3_note", user_id, idx=idx, note=note)
+
+
+# =========================
+# ADMIN OVERVIEW
+# =========================
+# ✅ HAMMA USER ID LARNI OLISH (broadcast uchun)
+# Katta ro'yxatlar uchun iter_user_ids() dan foydalaning
+async def get_all_user_ids(limit: int = 100000) -> list[int]:
+    rows = await _read(
+        "fetch",
+        "SELECT user_id FROM users WHERE bot=$2 ORDER BY created_at DESC, user_id DESC LIMIT $1",
+        limit, _t()
+    )
+    return [int(r["user_id"]) for r in rows]
+
+
+# /admin uchun: oxirgi userlar (replikadan)
+async def get_users_overview(limit: int = 30) -> list[dict]:
+    rows = await _read("fetch", """
+        SELECT user_id, full_name, state, stage3_idx,
+               stage2_text_done, stage2_audio_done, stage2_video_done, stage2_links_done
+        FROM users WHERE bot=$2
+        ORDER BY created_at DESC, user_id DESC LIMIT $1
+    """, limit, _t())
+    return [dict(r) for r in rows]
+
+
+# =========================
+# STREAMING (broadcast / export / reminder)
+# Hamma userni listga yig'may, keyset pagination bilan bo'lak-bo'lak o'qiymiz.
+# Har bo'lak uchun ulanish alohida olinadi - pool uzoq band qilinmaydi.
+# =========================
+_STAGE2_ALL = "(stage2_text_done AND stage2_audio_done AND stage2_video_done AND stage2_links_done)"
+
+
+def _segment_where(
+    args: list,
+    state: str | None = None,
+    level: str | None = None,
+    stage2_done: bool | None = None,
+    stage3_completed: bool | None = None,
+    inviter_id: int | None = None,
+    created_from=None,
+    created_to=None,
+) -> list[str]:
+    args.append(_t())
+    where = [f"bot=${len(args)}"]
+    if state is not None:
+        args.append(state)
+        where.append(f"state=${len(args)}")
+    if level is not None:
+        args.append(level)
+        where.append(f"level=${len(args)}")
+    if stage2_done is not None:
+        where.append(_STAGE2_ALL if stage2_done else f"NOT COALESCE({_STAGE2_ALL}, FALSE)")
+    if stage3_completed is not None:
+        args.append(stage3_completed)
+        where.append(f"COALESCE(stage3_completed, FALSE)=${len(args)}")
+    if inviter_id is not None:
+        args.append(inviter_id)
+        where.append(f"inviter_id=${len(args)}")
+    if created_from is not None:
+        args.append(created_from)
+        where.append(f"created_at>=${len(args)}")
+    if created_to is not None:
+        args.append(created_to)
+        where.append(f"created_at<${len(args)}")
+    return where
+
+
+async def iter_users(columns: str = "user_id", chunk_size: int = 1000, max_lag: float | None = None, **segment):
+    """Segment bo'yicha userlarni (created_at, user_id) tartibida stream qiladi (replikadan).
+    segment: state, level, stage2_done, stage3_completed, inviter_id, created_from, created_to"""
+    last = None
+    while True:
+        args: list = []
+        where = _segment_where(args, **segment)
+        if last is not None:
+            args.extend(last)
+            where.append(f"(created_at, user_id) > (${len(args) - 1}, ${len(args)})")
+        args.append(chunk_size)
+        sql = (
+            f"SELECT {columns}, created_at AS _k_created, user_id AS _k_user FROM users "
+            f"WHERE {' AND '.join(where)} "
+            f"ORDER BY created_at, user_id LIMIT ${len(args)}"
+        )
+
+        rows = await _read("fetch", sql, *args, max_lag=max_lag)
+
+        for r in rows:
+            yield r
+        if len(rows) < chunk_size:
+            return
+        last = (rows[-1]["_k_created"], rows[-1]["_k_user"])
+
+
+async def iter_user_ids(chunk_size: int = 1000, max_lag: float | None = None, **segment):
+    async for r in iter_users("user_id", chunk_size, max_lag, **segment):
+        yield int(r["user_id"])
+
+
+async def count_users(**segment) -> int:
+    args: list = []
+    where = _segment_where(args, **segment)
+    return int(await _read("fetchval", f"SELECT COUNT(*) FROM users WHERE {' AND '.join(where)}", *args))
+
+
+# =========================
+# HAND-OFF (keyingi botga o'tkazish)
+# =========================
+# Hali ro'yxatdan o'tib bo'lmagan holatlar: faqat shularda state HANDOFF ga o'tadi,
+# keyingi botda progressi bor userning state i o'zgarmaydi.
+_PRE_REG_STATES = ["", "HANDOFF", "REG_NAME", "REG_XJ_ID", "REG_JOIN_DATE", "REG_PHONE", "REG_LEVEL", "REG_CONFIRM"]
+
+
+_HANDOFF_SQL = """
+            INSERT INTO users(bot, user_id, inviter_id, ref_code, state,
+                              full_name, xj_id, join_date_text, phone, level, lang, handoff_from)
+            SELECT $3, user_id, inviter_id, $4, 'HANDOFF',
+                   full_name, xj_id, join_date_text, phone, level, lang, bot
+            FROM users WHERE user_id=$1 AND bot=$2
+            ON CONFLICT(bot, user_id) DO UPDATE SET
+                state=CASE WHEN COALESCE(users.state, '') = ANY($5::text[]) THEN 'HANDOFF' ELSE users.state END,
+                full_name=EXCLUDED.full_name,
+                xj_id=EXCLUDED.xj_id,
+                join_date_text=EXCLUDED.join_date_text,
+                phone=EXCLUDED.phone,
+                level=EXCLUDED.level,
+                lang=EXCLUDED.lang,
+                handoff_from=EXCLUDED.handoff_from
+        """
+
+
+async def handoff_user(user_id: int, to_bot: str):
+    """Joriy botdagi ro'yxat ma'lumotlarini keyingi botga ko'chiradi.
+    Keyingi botda user qayta ro'yxatdan o'tmaydi (state=HANDOFF).
+    Journal orqali ketadi: kutayotgan yozuvlardan keyin, yangilangan profil bilan bajariladi."""
+    await _mutate("handoff", user_id, to_bot=to_bot, ref_code=secrets.token_hex(4))
+    _lang_cache.pop((to_bot, user_id), None)
+
+
+# =========================
+# CSV IMPORT (COPY -> staging -> bitta MERGE)
+# =========================
+_IMPORT_COLUMNS = ["row_no", "user_id", "full_name", "xj_id", "join_date_text", "phone", "level"]
+
+
+async def import_users(records, chunk_size: int = 5000) -> tuple[int, int]:
+    """records: (row_no, user_id, full_name, xj_id, join_date_text, phone, level) tuple lar.
+    Yangi userlar state=HANDOFF bilan qo'shiladi (/start da qayta ro'yxatdan o'tmaydi),
+    mavjudlarining profil maydonlari yangilanadi. (qo'shildi, yangilandi) qaytaradi."""
     pool = _p()
     async with pool.acquire() as conn:
-        await conn.execute("""
-            INSERT INTO stage3_notes(user_id, idx, note)
-            VALUES($1,$2,$3)
-            ON CONFLICT(user_id, idx)
-            DO UPDATE SET note=EXCLUDED.note, created_at=NOW()
-        """, user_id, idx, note)
+        async with conn.transaction():
+            await conn.execute("""
+                CREATE TEMP TABLE import_users (
+                    row_no INT,
+                    user_id BIGINT,
+                    full_name TEXT,
+                    xj_id TEXT,
+                    join_date_text TEXT,
+                    phone TEXT,
+                    level TEXT
+                ) ON COMMIT DROP
+            """)
+
+            batch = []
+            for r in records:
+                batch.append(r)
+                if len(batch) >= chunk_size:
+                    await conn.copy_records_to_table("import_users", records=batch, columns=_IMPORT_COLUMNS)
+                    batch = []
+            if batch:
+                await conn.copy_records_to_table("import_users", records=batch, columns=_IMPORT_COLUMNS)
+
+            # bitta user_id bir necha marta bo'lsa - oxirgi qator.
+            # ref_code (bot, user_id) dan olinadi: import ichida to'qnashmaydi, 32 belgili
+            # bo'lgani uchun ensure_user dagi 8 belgili tasodifiy kodlar bilan ham to'qnashmaydi
+            rows = await conn.fetch("""
+                INSERT INTO users(bot, user_id, ref_code, state,
+                                  full_name, xj_id, join_date_text, phone, level, handoff_from)
+                SELECT DISTINCT ON (user_id)
+                       $1, user_id, md5($1 || ':' || user_id::text), 'HANDOFF',
+                       full_name, xj_id, join_date_text, phone, level, 'import'
+                FROM import_users
+                ORDER BY user_id, row_no DESC
+                ON CONFLICT(bot, user_id) DO UPDATE SET
+                    full_name=EXCLUDED.full_name,
+                    xj_id=EXCLUDED.xj_id,
+                    join_date_text=EXCLUDED.join_date_text,
+                    phone=EXCLUDED.phone,
+                    level=EXCLUDED.level
+                RETURNING (xmax = 0) AS inserted
+            """, _t())
+
+    inserted = sum(1 for r in rows if r["inserted"])
+    return inserted, len(rows) - inserted
 
 
 # =========================
-# ADMIN OVERVIEW
+# UPDATE DEDUP
 # =========================
-async def reset_stage2(user_id: int):
+async def claim_update(bot_id: int, update_id: int) -> bool:
+    """True - update birinchi marta ko'rildi, False - takror."""
     pool = _p()
     async with pool.acquire() as conn:
-        await conn.execute("""
-            UPDATE users SET
-                stage2_text_done=FALSE,
-                stage2_audio_done=FALSE,
-                stage2_video_done=FALSE,
-                stage2_links_done=FALSE
-            WHERE user_id=$1
-        """, user_id)
+        row = await conn.fetchrow("""
+            INSERT INTO processed_updates(bot_id, update_id)
+            VALUES($1,$2)
+            ON CONFLICT(bot_id, update_id) DO NOTHING
+            RETURNING update_id
+        """, bot_id, update_id)
+        return row is not None
 
 
-# ✅ HAMMA USER ID LARNI OLISH (broadcast uchun)
-async def get_all_user_ids(limit: int = 100000) -> list[int]:
+async def prune_processed_updates(ttl_seconds: int):
     pool = _p()
     async with pool.acquire() as conn:
-        rows = await conn.fetch(
-            "SELECT user_id FROM users ORDER BY created_at DESC LIMIT $1",
-            limit
+        await conn.execute(
+            "DELETE FROM processed_updates WHERE seen_at < NOW() - make_interval(secs => $1)",
+            float(ttl_seconds)
         )
-        return [int(r["user_id"]) for r in rows]
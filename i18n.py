@@ -0,0 +1,145 @@
+# i18n.py
+import json
+from contextvars import ContextVar
+from pathlib import Path
+from string import Formatter
+
+# =========================
+# MESSAGE CATALOG
+# Startupda bir marta yuklanadi va kompilyatsiya qilinadi:
+#   locales/uz_cyrl.json  - asosiy katalog (kirill)
+#   uz_latn               - kirilldan transliteratsiya bilan hosil qilinadi
+#   locales/<lang>.json   - qo'shimcha tillar / ustiga yozish (yo'q kalitlar asosiydan olinadi)
+# Yangi til qo'shish = yangi json fayl, kod o'zgarmaydi.
+# =========================
+LOCALES_DIR = Path(__file__).resolve().parent / "locales"
+BASE_LANG = "uz_cyrl"
+DEFAULT_LANG = BASE_LANG
+
+
+# ---------- transliteratsiya (o'zbek kirill -> lotin) ----------
+_CYR_LAT = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "yo",
+    "ж": "j", "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m",
+    "н": "n", "о": "o", "п": "p", "р": "r", "с": "s", "т": "t", "у": "u",
+    "ф": "f", "х": "x", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "sh", "ъ": "ʼ",
+    "ы": "i", "ь": "", "э": "e", "ю": "yu", "я": "ya", "ў": "oʻ", "қ": "q",
+    "ғ": "gʻ", "ҳ": "h",
+}
+# "е" so'z boshida va unlidan keyin "ye" bo'ladi
+_YE_AFTER = set("аеёиоуэюяўъь")
+
+
+def cyr_to_lat(text: str) -> str:
+    out = []
+    for i, ch in enumerate(text):
+        low = ch.lower()
+        if low not in _CYR_LAT:
+            out.append(ch)
+            continue
+
+        prev = text[i - 1].lower() if i else ""
+        if low == "е" and (not prev.isalpha() or prev in _YE_AFTER):
+            lat = "ye"
+        else:
+            lat = _CYR_LAT[low]
+
+        if ch != low and lat:
+            nxt = text[i + 1] if i + 1 < len(text) else ""
+            # "ШАҲАР" -> "SHAHAR", "Шаҳар" -> "Shahar"
+            lat = lat.upper() if nxt.isupper() or (prev.isalpha() and text[i - 1].isupper()) else lat[0].upper() + lat[1:]
+        out.append(lat)
+    return "".join(out)
+
+
+# hosil qilinadigan tillar: lang -> (manba til, funksiya)
+_DERIVED = {"uz_latn": (BASE_LANG, cyr_to_lat)}
+
+
+# ---------- shablonlar ----------
+class Template:
+    """Oldindan parse qilingan shablon: render paytida faqat bo'laklar ulanadi.
+    str.format bilan bir xil natija beradi ({x!r}, {x:>5}, {u.name} ham ishlaydi)."""
+
+    __slots__ = ("parts", "static")
+
+    def __init__(self, text: str):
+        # (literal, field, spec, conv); oddiy {name} uchun spec/conv None - tez yo'l
+        self.parts = []
+        for lit, field, spec, conv in _FMT.parse(text):
+            if spec and "{" in spec:
+                raise ValueError(f"ichma-ich format spec qo'llab-quvvatlanmaydi: {text!r}")
+            self.parts.append((lit, field, spec or None, conv))
+        self.static = None
+        if all(field is None for _lit, field, _spec, _conv in self.parts):
+            self.static = "".join(lit for lit, _field, _spec, _conv in self.parts)
+
+    def render(self, **kw) -> str:
+        if self.static is not None:
+            return self.static
+        out = []
+        for lit, field, spec, conv in self.parts:
+            out.append(lit)
+            if field is None:
+                continue
+            if spec is None and conv is None and field in kw:
+                out.append(str(kw[field]))
+                continue
+            value = _FMT.get_field(field, (), kw)[0]
+            if conv:
+                value = _FMT.convert_field(value, conv)
+            out.append(format(value, spec or ""))
+        return "".join(out)
+
+
+_FMT = Formatter()
+
+
+def _read(lang: str) -> dict:
+    path = LOCALES_DIR / f"{lang}.json"
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def load() -> dict[str, dict[str, Template]]:
+    raw: dict[str, dict[str, str]] = {BASE_LANG: _read(BASE_LANG)}
+
+    for lang, (src, fn) in _DERIVED.items():
+        raw[lang] = {k: fn(v) for k, v in raw[src].items()}
+
+    for path in sorted(LOCALES_DIR.glob("*.json")):
+        lang = path.stem
+        if lang == BASE_LANG:
+            continue
+        raw[lang] = {**raw.get(lang, raw[BASE_LANG]), **_read(lang)}
+
+    return {lang: {k: Template(v) for k, v in msgs.items()} for lang, msgs in raw.items()}
+
+
+CATALOG = load()
+LANGS = list(CATALOG)
+
+_lang: ContextVar[str] = ContextVar("lang", default=DEFAULT_LANG)
+
+
+def set_lang(lang: str):
+    return _lang.set(lang if lang in CATALOG else DEFAULT_LANG)
+
+
+def reset_lang(token):
+    _lang.reset(token)
+
+
+def lang() -> str:
+    return _lang.get()
+
+
+def tl(lang: str, key: str, **kw) -> str:
+    tpl = CATALOG.get(lang, {}).get(key) or CATALOG[BASE_LANG][key]
+    return tpl.render(**kw)
+
+
+def t(key: str, **kw) -> str:
+    """Joriy user tilida xabar."""
+    return tl(_lang.get(), key, **kw)
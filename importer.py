@@ -0,0 +1,90 @@
+# importer.py
+import csv
+import io
+import re
+
+from keyboards import LEVELS
+
+# =========================
+# CSV IMPORT (/import)
+# Hamkorlar bazasini bitta fayl bilan yuklash: qatorlar oqim bo'yicha
+# tekshiriladi va bo'laklab db.import_users() ga beriladi.
+# =========================
+COLUMNS = ["user_id", "full_name", "xj_id", "join_date_text", "phone", "level"]
+REQUIRED = ["user_id", "full_name", "xj_id", "phone", "level"]
+
+# faqat ASCII raqamlar: \d va str.isdigit() "²", "٣" kabilarni ham qabul qiladi
+_PHONE_RE = re.compile(r"\+?[0-9]{9,15}")
+_PHONE_STRIP = re.compile(r"[\s\-()]")
+_LEVELS = {lvl.lower(): lvl for lvl in LEVELS}
+_MAX_BIGINT = 2 ** 63
+
+
+def _is_ascii_digits(s: str) -> bool:
+    return s.isascii() and s.isdigit()
+
+
+class CsvImportError(ValueError):
+    """Fayl umuman o'qib bo'lmaydigan holatda (sarlavha yo'q va h.k.)."""
+
+
+def _validate(row: dict) -> tuple[tuple | None, str]:
+    uid = row.get("user_id", "").strip()
+    if not _is_ascii_digits(uid):
+        return None, "user_id рақам эмас"
+    if not 0 < int(uid) < _MAX_BIGINT:
+        return None, "user_id нотўғри"
+
+    full_name = row.get("full_name", "").strip()
+    if len(full_name) < 3:
+        return None, "исм жуда қисқа"
+
+    xj_id = row.get("xj_id", "").strip()
+    if not (_is_ascii_digits(xj_id) and len(xj_id) == 7):
+        return None, "XJ ID 7 хонали эмас"
+
+    phone = _PHONE_STRIP.sub("", row.get("phone", ""))
+    if not _PHONE_RE.fullmatch(phone):
+        return None, "телефон нотўғри"
+
+    level = _LEVELS.get(row.get("level", "").strip().lower())
+    if level is None:
+        return None, "даража нотўғри"
+
+    return (int(uid), full_name, xj_id, row.get("join_date_text", "").strip(), phone, level), ""
+
+
+def parse(data: bytes, rejects: list):
+    """CSV ni o'qiydi, to'g'ri qatorlarni (row_no, *COLUMNS) tuple sifatida qaytaradi.
+    Xato qatorlar rejects ga (row_no, sabab, xom qator) bo'lib tushadi."""
+    text = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", errors="replace", newline="")
+    header_line = text.readline()
+    if not header_line.strip():
+        raise CsvImportError("Файл бўш.")
+
+    delimiter = max(",;\t", key=header_line.count)
+    header = [h.strip().lower() for h in next(csv.reader([header_line], delimiter=delimiter))]
+    missing = [c for c in REQUIRED if c not in header]
+    if missing:
+        raise CsvImportError("Устунлар етишмайди: " + ", ".join(missing))
+
+    # row_no - fayldagi qator raqami (ko'p qatorli qo'shtirnoqli maydonlar hisobga olinadi)
+    reader = csv.reader(text, delimiter=delimiter)
+    next_line = 2
+    for values in reader:
+        row_no, next_line = next_line, reader.line_num + 2
+        if not any(v.strip() for v in values):
+            continue
+        record, reason = _validate(dict(zip(header, values)))
+        if record is None:
+            rejects.append((row_no, reason, delimiter.join(values)))
+            continue
+        yield (row_no, *record)
+
+
+def rejects_csv(rejects: list) -> bytes:
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(["row", "reason", "raw"])
+    w.writerows(rejects)
+    return buf.getvalue().encode("utf-8-sig")
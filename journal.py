@@ -0,0 +1,134 @@
+# journal.py
+import asyncio
+import json
+import os
+from pathlib import Path
+
+# =========================
+# WRITE-AHEAD JOURNAL
+# Postgres sekin/ishlamayotgan paytda user yozuvlari shu faylga qo'shiladi
+# (append-only, fsync guruhlab), baza tiklangach tartib bilan qayta yoziladi.
+#
+#   <path>       - JSON qatorlar: {"seq", "t", "op", "u", "kw"}
+#   <path>.pos   - bazaga yozib bo'lingan oxirgi seq
+#   <path>.dead  - bazaga yozib bo'lmaydigan yozuvlar (+ xato matni), qo'lda ko'rish uchun
+# =========================
+class Journal:
+    def __init__(self, path: str | Path, flush_delay: float = 0.01):
+        self.path = Path(path)
+        self.pos_path = self.path.with_name(self.path.name + ".pos")
+        self.dead_path = self.path.with_name(self.path.name + ".dead")
+        self.flush_delay = flush_delay
+
+        self._seq = 0
+        self._committed = 0
+        self._durable = 0   # fsync qilingan oxirgi seq
+        self._backlog: list[dict] = []
+        self._buf: list[str] = []
+        self._flush_fut: asyncio.Future | None = None
+        self._fh = None
+
+    # ---------- startup ----------
+    def load(self) -> list[dict]:
+        """Fayldan hali bazaga yozilmagan yozuvlarni o'qiydi."""
+        if self.pos_path.exists():
+            self._committed = int(self.pos_path.read_text().strip() or 0)
+
+        if self.path.exists():
+            with self.path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # oxirgi qator yarim yozilgan bo'lishi mumkin
+                    self._seq = max(self._seq, entry["seq"])
+                    if entry["seq"] > self._committed:
+                        self._backlog.append(entry)
+        self._seq = max(self._seq, self._committed)
+        self._durable = self._seq
+
+        self._fh = self.path.open("a", encoding="utf-8")
+        return list(self._backlog)
+
+    def close(self):
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+
+    # ---------- yozish ----------
+    def pending(self) -> int:
+        return len(self._backlog)
+
+    def enqueue(self, tenant: str, op: str, user_id: int, kw: dict) -> dict:
+        """Yozuvni navbatga qo'yadi (await siz). Diskka tushishini flush() kutadi."""
+        self._seq += 1
+        entry = {"seq": self._seq, "t": tenant, "op": op, "u": user_id, "kw": kw}
+        self._backlog.append(entry)
+        self._buf.append(json.dumps(entry, ensure_ascii=False) + "\n")
+
+        # group commit: shu oraliqdagi hamma yozuvlar bitta fsync bilan
+        if self._flush_fut is None:
+            self._flush_fut = asyncio.get_running_loop().create_future()
+            asyncio.get_running_loop().call_later(
+                self.flush_delay, lambda: asyncio.ensure_future(self._flush())
+            )
+        return entry
+
+    async def flush(self):
+        """Navbatdagi yozuvlar fsync bo'lguncha kutadi."""
+        if self._flush_fut is not None:
+            await asyncio.shield(self._flush_fut)
+
+    def _write_sync(self, data: str):
+        self._fh.write(data)
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    async def _flush(self):
+        fut, self._flush_fut = self._flush_fut, None
+        data, self._buf = "".join(self._buf), []
+        upto = self._seq
+        try:
+            await asyncio.to_thread(self._write_sync, data)
+        except Exception as e:
+            # keyingi flush qayta urinadi (yozuvlar idempotent - takror qator zararsiz)
+            self._buf.insert(0, data)
+            fut.set_exception(e)
+        else:
+            self._durable = upto
+            fut.set_result(None)
+
+    # ---------- replay ----------
+    def peek(self, n: int) -> list[dict]:
+        """Faqat diskka tushgan (fsync) yozuvlar - hali tasdiqlanmagan yozuv bazaga ketmasin."""
+        out = []
+        for entry in self._backlog[:n]:
+            if entry["seq"] > self._durable:
+                break
+            out.append(entry)
+        return out
+
+    def commit(self, n: int) -> int:
+        """Birinchi n ta yozuv bazaga yozildi. Oxirgi seq ni qaytaradi."""
+        done, self._backlog = self._backlog[:n], self._backlog[n:]
+        if not done:
+            return self._committed
+        self._committed = done[-1]["seq"]
+
+        tmp = self.pos_path.with_name(self.pos_path.name + ".tmp")
+        tmp.write_text(str(self._committed))
+        os.replace(tmp, self.pos_path)
+
+        # hammasi yozilgan va buferda hech narsa yo'q: faylni qisqartiramiz
+        if not self._backlog and not self._buf and self._flush_fut is None:
+            self._fh.truncate(0)
+            self._fh.seek(0)
+        return self._committed
+
+    def dead_letter(self, entry: dict, error: str):
+        """Yozuvni .dead fayliga ko'chiradi (commit() chaqiruvchi tomonda)."""
+        line = json.dumps({**entry, "error": error}, ensure_ascii=False) + "\n"
+        with self.dead_path.open("a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
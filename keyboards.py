@@ -1,40 +1,52 @@
 # keyboards.py
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
+from functools import lru_cache
+
+from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+import i18n
+from i18n import tl
+
+LEVELS = ["Oddiy Xamkor", "XJ Manager", "XJ Bronza", "XJ Silver"]
+
+# Klaviaturalar har bir til uchun bir marta quriladi (lru_cache), keyin tayyor obyekt qaytadi.
+
 def kb_start():
+    return _kb_start(i18n.lang())
+
+@lru_cache(maxsize=None)
+def _kb_start(lang: str):
     kb = InlineKeyboardBuilder()
-    kb.button(text="✅ Бошлаш", callback_data="start:begin")
+    kb.button(text=tl(lang, "btn_start"), callback_data="start:begin")
     return kb.as_markup()
 
 def kb_contact():
+    return _kb_contact(i18n.lang())
+
+@lru_cache(maxsize=None)
+def _kb_contact(lang: str):
     return ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text="📞 Контакт юбориш", request_contact=True)]],
+        keyboard=[[KeyboardButton(text=tl(lang, "btn_contact"), request_contact=True)]],
         resize_keyboard=True,
         one_time_keyboard=True
     )
 
+@lru_cache(maxsize=None)
 def kb_levels():
     kb = InlineKeyboardBuilder()
-    for lvl in ["Oddiy Xamkor", "XJ Manager", "XJ Bronze", "XJ Silver"]:
-        kb.button(text=lvl, callback_data=f"reg:level:{lvl}")
-    kb.adjust(2)
-    return kb.as_markup()
-
-def kb_levels():
-    kb = InlineKeyboardBuilder()
-    for lvl in ["Oddiy Xamkor", "XJ Manager", "XJ Bronza", "XJ Silver"]:
+    for lvl in LEVELS:
         kb.button(text=lvl, callback_data=f"reg:level:{lvl}")
     kb.adjust(2)
     return kb.as_markup()
 
 def kb_edit_fields():
+    return _kb_edit_fields(i18n.lang())
+
+@lru_cache(maxsize=None)
+def _kb_edit_fields(lang: str):
     kb = InlineKeyboardBuilder()
-    kb.button(text="👤 Исм", callback_data="edit:full_name")
-    kb.button(text="🆔 XJ ID", callback_data="edit:xj_id")
-    kb.button(text="📅 Қўшилган вақт", callback_data="edit:join_date_text")
-    kb.button(text="📞 Телефон", callback_data="edit:phone")
-    kb.button(text="⭐ Даража", callback_data="edit:level")
+    for field in ["full_name", "xj_id", "join_date_text", "phone", "level"]:
+        kb.button(text=tl(lang, f"btn_edit_{field}"), callback_data=f"edit:{field}")
     kb.adjust(2)
     return kb.as_markup()
 
@@ -43,35 +55,66 @@ def _status(done: bool) -> str:
 
 def kb_material_menu(progress: dict):
     # progress keys: text_done, audio_done, video_done, links_done
+    return _kb_material_menu(
+        i18n.lang(),
+        progress["text_done"], progress["audio_done"], progress["video_done"], progress["links_done"]
+    )
+
+@lru_cache(maxsize=None)
+def _kb_material_menu(lang: str, text_done: bool, audio_done: bool, video_done: bool, links_done: bool):
     kb = InlineKeyboardBuilder()
-    kb.button(text=f"{_status(progress['text_done'])} 📘 Матн", callback_data="m2:open:text")
-    kb.button(text=f"{_status(progress['audio_done'])} 🎧 Аудио", callback_data="m2:open:audio")
-    kb.button(text=f"{_status(progress['video_done'])} 🎥 Видео", callback_data="m2:open:video")
-    kb.button(text=f"{_status(progress['links_done'])} 🔗 Линклар", callback_data="m2:open:links")
+    kb.button(text=tl(lang, "btn_m2_text", status=_status(text_done)), callback_data="m2:open:text")
+    kb.button(text=tl(lang, "btn_m2_audio", status=_status(audio_done)), callback_data="m2:open:audio")
+    kb.button(text=tl(lang, "btn_m2_video", status=_status(video_done)), callback_data="m2:open:video")
+    kb.button(text=tl(lang, "btn_m2_links", status=_status(links_done)), callback_data="m2:open:links")
     kb.adjust(2)
 
-    all_done = progress["text_done"] and progress["audio_done"] and progress["video_done"] and progress["links_done"]
+    all_done = text_done and audio_done and video_done and links_done
     if all_done:
-        kb.button(text="➡️ Давом этиш", callback_data="m2:continue")
+        kb.button(text=tl(lang, "btn_continue"), callback_data="m2:continue")
     else:
-        kb.button(text="🔒 Давом этиш", callback_data="m2:continue_locked")
+        kb.button(text=tl(lang, "btn_continue_locked"), callback_data="m2:continue_locked")
     kb.adjust(2, 2, 1)
     return kb.as_markup()
 
+@lru_cache(maxsize=None)
 def kb_done_button(text: str, cb: str):
     kb = InlineKeyboardBuilder()
     kb.button(text=text, callback_data=cb)
     return kb.as_markup()
 
 def kb_stage3_start():
+    return _kb_stage3_start(i18n.lang())
+
+@lru_cache(maxsize=None)
+def _kb_stage3_start(lang: str):
     kb = InlineKeyboardBuilder()
-    kb.button(text="✅ Бошлаймиз", callback_data="s3:start")
+    kb.button(text=tl(lang, "btn_s3_start"), callback_data="s3:start")
     return kb.as_markup()
-from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 def kb_confirm():
+    return _kb_confirm(i18n.lang())
+
+@lru_cache(maxsize=None)
+def _kb_confirm(lang: str):
     kb = InlineKeyboardBuilder()
-    kb.button(text="✅ Ҳа, тасдиқлайман", callback_data="reg:confirm:yes")
-    kb.button(text="✏️ Таҳрирлаш", callback_data="reg:confirm:edit")
+    kb.button(text=tl(lang, "btn_confirm_yes"), callback_data="reg:confirm:yes")
+    kb.button(text=tl(lang, "btn_confirm_edit"), callback_data="reg:confirm:edit")
     kb.adjust(1)
     return kb.as_markup()
+
+@lru_cache(maxsize=None)
+def kb_lang():
+    kb = InlineKeyboardBuilder()
+    for lang in i18n.LANGS:
+        kb.button(text=i18n.CATALOG[lang]["lang_name"].render(), callback_data=f"lang:{lang}")
+    kb.adjust(1)
+    return kb.as_markup()
+
+def prebuild():
+    """Startupda hamma til uchun klaviaturalarni oldindan quradi."""
+    for lang in i18n.LANGS:
+        _kb_start(lang); _kb_contact(lang); _kb_edit_fields(lang); _kb_stage3_start(lang); _kb_confirm(lang)
+        for mask in range(16):
+            _kb_material_menu(lang, bool(mask & 1), bool(mask & 2), bool(mask & 4), bool(mask & 8))
+    kb_levels(); kb_lang()
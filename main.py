@@ -1,24 +1,31 @@
 # main.py
 import asyncio
-from pathlib import Path
+import html
+import time
 import traceback
 
 from aiogram import Bot, Dispatcher, F
-from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.types import Message, CallbackQuery, FSInputFile, BufferedInputFile
 from aiogram.filters import CommandStart, Command
 from aiogram.enums import ParseMode
 
+import bots
 import db
-from config import BOT_TOKEN, DATABASE_URL, NEXT_BOT_LINK, ADMIN_IDS
+import i18n
+import importer
+import profiler
+from i18n import t
+from config import (
+    DATABASE_URL, ADMIN_IDS, WRITE_JOURNAL_PATH, DB_WRITE_TIMEOUT,
+    DATABASE_REPLICA_URL, REPLICA_MAX_LAG,
+    UPDATE_DEDUP_TTL, UPDATE_DEDUP_MAX, UPDATE_DEDUP_DB
+)
+from middlewares import UpdateDedupMiddleware, SingleFlightMiddleware, TenantMiddleware, LocaleMiddleware
 from keyboards import (
     kb_start, kb_contact, kb_levels, kb_confirm, kb_edit_fields,
-    kb_material_menu, kb_done_button, kb_stage3_start
+    kb_material_menu, kb_done_button, kb_stage3_start, kb_lang, prebuild, LEVELS
 )
 
-BASE_DIR = Path(__file__).resolve().parent
-STAGE2_DIR = BASE_DIR / "content" / "stage4"   # 2-bosqich material shu yerdan olinadi
-STAGE3_DIR = BASE_DIR / "content" / "stage3"
-
 # ======================
 # STATES
 # ======================
@@ -34,25 +41,25 @@ MATERIAL_MENU = "MATERIAL_MENU"
 STAGE3_INTRO = "STAGE3_INTRO"
 STAGE3_WAIT_NOTE = "STAGE3_WAIT_NOTE"
 DONE = "DONE"
+HANDOFF = "HANDOFF"   # oldingi botdan ma'lumotlari bilan o'tkazilgan
 
-# Stage3 audio list (11 ta)
-STAGE3_AUDIO_FILES = [
-    "10-ASOS DARSLIGI.mp3",
-    "1-ASOS.mp3",
-    "2-ASOS-COVER.mp3",
-    "3-ASOS-COVER.mp3",
-    "4-ASOS.mp3",
-    "5-ASOS.mp3",
-    "6-ASOS.mp3",
-    "7-ASOS.mp3",
-    "8-ASOS.mp3",
-    "9-ASOS.mp3",
-    "10-ASOS-2.mp3",
-]
-
-bot = Bot(BOT_TOKEN, parse_mode=ParseMode.HTML)
+# Bitta Dispatcher / event loop / DB pool - bir nechta bot (bots.py)
+BOTS = {p.name: Bot(p.token, parse_mode=ParseMode.HTML) for p in bots.PROFILES}
 dp = Dispatcher()
 
+def cur_bot() -> Bot:
+    return BOTS[bots.current().name]
+
+# Takroriy update_id lar handlerga yetib bormaydi
+dedup = UpdateDedupMiddleware(ttl=UPDATE_DEDUP_TTL, max_size=UPDATE_DEDUP_MAX, use_db=UPDATE_DEDUP_DB)
+dp.update.outer_middleware(dedup)
+dp.update.outer_middleware(TenantMiddleware())
+dp.update.outer_middleware(LocaleMiddleware())
+
+# Og'ir callbacklar (katta fayl yuborish) bir vaqtda bitta ishlaydi
+single_flight = SingleFlightMiddleware(debounce=5.0)
+dp.callback_query.middleware(single_flight)
+
 # ======================
 # HELPERS
 # ======================
@@ -81,7 +88,7 @@ async def admin_notify(text: str):
         return
     for aid in ADMIN_IDS:
         try:
-            await bot.send_message(aid, text)
+            await cur_bot().send_message(aid, text)
         except:
             pass
 
@@ -89,26 +96,60 @@ def stage2_remaining_list(progress: dict) -> list[str]:
     progress = normalize_stage2(progress)
     rem = []
     if not progress["text_done"]:
-        rem.append("📘 Матн")
+        rem.append(t("item_text"))
     if not progress["audio_done"]:
-        rem.append("🎧 Аудио")
+        rem.append(t("item_audio"))
     if not progress["video_done"]:
-        rem.append("🎥 Видео")
+        rem.append(t("item_video"))
     if not progress["links_done"]:
-        rem.append("🔗 Линклар")
+        rem.append(t("item_links"))
     return rem
 
 # ======================
 # STARTUP / SHUTDOWN
 # ======================
+async def _journal_dead_letter(entry: dict, error: str):
+    await admin_notify(
+        "⚠️ JOURNAL DEAD-LETTER\n"
+        f"seq={entry['seq']} | bot=<code>{entry['t']}</code> | user=<code>{entry['u']}</code> | op={entry['op']}\n"
+        f"{html.escape(error)}"
+    )
+
 async def on_startup():
-    await db.init(DATABASE_URL)
+    await db.init(
+        DATABASE_URL,
+        journal_path=WRITE_JOURNAL_PATH,
+        write_timeout=DB_WRITE_TIMEOUT,
+        replica_dsn=DATABASE_REPLICA_URL,
+        replica_max_lag=REPLICA_MAX_LAG,
+        on_dead_letter=_journal_dead_letter,
+    )
     print("✅ DB connected & schema ready")
 
+    prebuild()
+    print(f"🔤 locales: {', '.join(i18n.LANGS)}")
+
+    # keyingi bot havolasi (next_link berilmagan bo'lsa username dan)
+    for p in bots.PROFILES:
+        me = await BOTS[p.name].get_me()
+        p.link = f"https://t.me/{me.username}"
+        print(f"🤖 bot '{p.name}' -> @{me.username}")
+
 async def on_shutdown():
     await db.close()
+    for b in BOTS.values():
+        await b.session.close()
     print("🛑 DB closed")
 
+async def handoff_to_next_bot(user_id: int) -> str:
+    """Keyingi bot shu processda bo'lsa, ma'lumotlarni unga o'tkazadi. Havolani qaytaradi."""
+    profile = bots.current()
+    nxt = bots.next_profile(profile)
+    if nxt is None:
+        return profile.next_link
+    await db.handoff_user(user_id, nxt.tenant)
+    return profile.next_link or nxt.link
+
 # ======================
 # ADMIN
 # ======================
@@ -134,10 +175,17 @@ async def cmd_admin(message: Message):
             "—"
         )
 
+    lines.append(f"\n🔁 Такрор update ташланди: <b>{dedup.dropped()}</b>")
+    lines.append(f"🗄 Реплика: <b>{db.replica_status()}</b>")
+    lines.append(f"📝 Журналда кутаётган ёзувлар: <b>{db.journal_pending()}</b>")
+    lines.append(f"⏳ Такрор босишлар бирлаштирилди: <b>{single_flight.stats['coalesced']}</b>")
+
     lines.append(
         "\n<b>Хабар юбориш:</b>\n"
         "<code>/send USER_ID матн</code>\n"
-        "<code>/broadcast матн</code>"
+        "<code>/broadcast матн</code>\n"
+        "<code>/profile СЕКУНД</code>\n"
+        "<code>/import</code> (CSV файл)"
     )
     await message.answer("\n".join(lines))
 
@@ -153,7 +201,7 @@ async def cmd_send(message: Message):
     uid = int(parts[1])
     txt = parts[2]
     try:
-        await bot.send_message(uid, f"📩 <b>Админдан хабар:</b>\n\n{txt}")
+        await cur_bot().send_message(uid, i18n.tl(await db.get_lang(uid), "admin_message", text=txt))
         await message.answer("✅ Юборилди.")
     except Exception as e:
         await message.answer(f"❌ Юборилмади: {e}")
@@ -168,18 +216,102 @@ async def cmd_broadcast(message: Message):
         return await message.answer("Формат: <code>/broadcast матн</code>")
 
     txt = parts[1]
-    users = await db.get_users_overview(limit=100000)
 
+    # userlar bo'lak-bo'lak o'qiladi (hammasi xotiraga yig'ilmaydi)
     sent = 0
-    for u in users:
+    async for u in db.iter_users("user_id, lang"):
         try:
-            await bot.send_message(u["user_id"], f"📢 <b>Админдан хабар:</b>\n\n{txt}")
+            await cur_bot().send_message(u["user_id"], i18n.tl(u["lang"], "broadcast_message", text=txt))
             sent += 1
         except:
             pass
 
     await message.answer(f"✅ {sent} та фойдаланувчига юборилди.")
 
+@dp.message(Command("profile"))
+async def cmd_profile(message: Message):
+    if not is_admin(message.from_user.id):
+        return
+
+    parts = message.text.split(maxsplit=1)
+    if len(parts) < 2 or not parts[1].strip().isdigit():
+        return await message.answer("Формат: <code>/profile СЕКУНД</code>")
+    seconds = min(int(parts[1]), profiler.MAX_SECONDS)
+
+    async def _send_report(report: str):
+        try:
+            await message.answer_document(
+                BufferedInputFile(report.encode("utf-8"), filename=f"profile_{seconds}s.txt"),
+                caption="📊 Профайл ҳисоботи"
+            )
+        except Exception:
+            await admin_notify("❌ PROFILE ERROR\n" + traceback.format_exc())
+
+    # handler update ni to'sib qo'ymasin: profil fon vazifasida (profiler.start sinxron band qiladi)
+    if not profiler.start(seconds, _send_report):
+        return await message.answer("⏳ Профайлер ҳозир ишлаяпти.")
+    await message.answer(f"⏱ Профайлер {seconds} сонияга ёқилди...")
+
+# CSV файл "/import" изоҳи билан юборилади (ёки файлга жавоб қилиб /import)
+@dp.message(Command("import"))
+async def cmd_import(message: Message):
+    if not is_admin(message.from_user.id):
+        return
+
+    doc = message.document
+    if doc is None and message.reply_to_message:
+        doc = message.reply_to_message.document
+    if doc is None:
+        return await message.answer(
+            "CSV файлни <code>/import</code> изоҳи билан юборинг.\n\n"
+            f"Устунлар: <code>{','.join(importer.COLUMNS)}</code>\n"
+            f"Даражалар: {', '.join(LEVELS)}"
+        )
+
+    started = time.perf_counter()
+    data = await cur_bot().download(doc)
+    rejects = []
+    try:
+        inserted, updated = await db.import_users(importer.parse(data.getvalue(), rejects))
+    except importer.CsvImportError as e:
+        return await message.answer(f"❌ {e}")
+    except Exception as e:
+        # COPY/MERGE xatosi butun tranzaksiyani bekor qiladi - hech narsa yozilmagan
+        await admin_notify("❌ IMPORT ERROR\n" + traceback.format_exc())
+        return await message.answer(f"❌ Импорт бекор қилинди, ҳеч нарса ёзилмади: <code>{e!r}</code>")
+    elapsed = time.perf_counter() - started
+
+    await message.answer(
+        "✅ <b>Импорт тугади</b>\n\n"
+        f"➕ Қўшилди: <b>{inserted}</b>\n"
+        f"♻️ Янгиланди: <b>{updated}</b>\n"
+        f"⛔️ Рад этилди: <b>{len(rejects)}</b>\n"
+        f"⏱ {elapsed:.1f} с"
+    )
+    if rejects:
+        await message.answer_document(
+            BufferedInputFile(importer.rejects_csv(rejects), filename="import_rejects.csv"),
+            caption="⛔️ Рад этилган қаторлар"
+        )
+
+# ======================
+# /lang (кирилл / lotin)
+# ======================
+@dp.message(Command("lang"))
+async def cmd_lang(message: Message):
+    await message.answer(t("lang_choose"), reply_markup=kb_lang())
+
+@dp.callback_query(F.data.startswith("lang:"))
+async def lang_set(call: CallbackQuery):
+    await call.answer()
+    lang = call.data.split(":", 1)[1]
+    if lang not in i18n.CATALOG:
+        return
+    await db.ensure_user(call.from_user.id)
+    await db.set_lang(call.from_user.id, lang)
+    i18n.set_lang(lang)
+    await call.message.answer(t("lang_set"))
+
 # ======================
 # /start
 # ======================
@@ -194,17 +326,20 @@ async def cmd_start(message: Message):
 
     await db.ensure_user(user_id, inviter_id)
 
+    # Oldingi botdan o'tkazilgan: qayta ro'yxatdan o'tmaydi
+    if await db.get_state(user_id) == HANDOFF:
+        await db.set_state(user_id, MATERIAL_MENU)
+        await db.reset_stage2(user_id)
+        progress = normalize_stage2(await db.get_stage2(user_id))
+        await admin_notify(f"🟢 /start (handoff) | user=<code>{user_id}</code>")
+        return await message.answer(t("start_handoff"), reply_markup=kb_material_menu(progress))
+
     # MUHIM: startda state bo'sh bo'ladi
     await db.set_state(user_id, "")
     await db.set_stage3_idx(user_id, 0)
     await db.set_stage3_waiting(user_id, False)
 
-    await message.answer(
-        "<b>👋 Салом! Мен XJ расмий ботингизман.</b>\n\n"
-        "XJ да натижага эришишингиз учун сизга босқичма-босқич ёрдам бераман.\n\n"
-        "Бошлаш учун қуйидаги тугмани босинг 👇",
-        reply_markup=kb_start()
-    )
+    await message.answer(t("start_welcome"), reply_markup=kb_start())
 
     await admin_notify(f"🟢 /start | user=<code>{user_id}</code>")
 
@@ -213,12 +348,8 @@ async def start_begin(call: CallbackQuery):
     await call.answer()
     await db.set_state(call.from_user.id, REG_NAME)
 
-    # ✅ B) Ism familiya namuna bilan (to‘g‘ri string!)
-    await call.message.answer(
-        "Рўйхатдан ўтишни бошлаймиз ✅\n\n"
-        "✍️ Илтимос, исм ва фамилиянгизни киритинг.\n"
-        "(Намуна: Ali Alijonov)"
-    )
+    # ✅ B) Ism familiya namuna bilan
+    await call.message.answer(t("reg_begin"))
 
 # ======================
 # TEXT HANDLER
@@ -234,31 +365,28 @@ async def text_handler(message: Message):
         await admin_notify(f"🟦 TEXT | user={user_id} | state={state} | text={text}")
 
         # komandalar bu yerda ushlanmaydi
-        if text.startswith("/admin") or text.startswith("/send") or text.startswith("/broadcast"):
+        if text.startswith(("/admin", "/send", "/broadcast", "/profile", "/import", "/lang")):
             return
 
         # Agar hali "Бошлаш" bosilmagan bo‘lsa
         if state == "":
-            return await message.answer(
-                "Илтимос, аввал ✅ <b>Бошлаш</b> тугмасини босинг.",
-                reply_markup=kb_start()
-            )
+            return await message.answer(t("press_start_first"), reply_markup=kb_start())
 
         # 1) Ism-familiya
         if state == REG_NAME:
             if len(text) < 3:
-                return await message.answer("Илтимос, исм-фамилияни тўлиқроқ ёзинг.")
+                return await message.answer(t("reg_name_short"))
             await db.set_user_field(user_id, "full_name", text)
             await db.set_state(user_id, REG_XJ_ID)
-            return await message.answer("Раҳмат ✅\n\nЭнди XJ ID ни киритинг (7 хонали).")
+            return await message.answer(t("reg_ask_xj_id"))
 
         # 2) XJ ID
         if state == REG_XJ_ID:
             if not (text.isdigit() and len(text) == 7):
-                return await message.answer("XJ ID 7 хонали рақам бўлиши керак.\nМасалан: 0123456")
+                return await message.answer(t("reg_xj_id_invalid"))
             await db.set_user_field(user_id, "xj_id", text)
             await db.set_state(user_id, REG_JOIN_DATE)
-            return await message.answer("Қабул қилинди ✅\n\nXJ га қачон қўшилгансиз? (эркин ёзинг)")
+            return await message.answer(t("reg_ask_join_date"))
 
         # 3) Join date
         if state == REG_JOIN_DATE:
@@ -266,12 +394,7 @@ async def text_handler(message: Message):
             await db.set_state(user_id, REG_PHONE)
 
             # ✅ G) Telefon namuna bilan
-            return await message.answer(
-                "Тушунарли ✅\n\n"
-                "📞 Энди телефон рақамингизни юборинг.\n"
-                "(Намуна: +998991234567) 👇",
-                reply_markup=kb_contact()
-            )
+            return await message.answer(t("reg_ask_phone"), reply_markup=kb_contact())
 
         # Stage3 izoh
         if state == STAGE3_WAIT_NOTE:
@@ -281,15 +404,17 @@ async def text_handler(message: Message):
             await db.set_stage3_waiting(user_id, False)
 
             next_idx = idx + 1
-            if next_idx >= len(STAGE3_AUDIO_FILES):
+            if next_idx >= len(bots.current().stage3_audio):
                 await db.set_stage3_completed(user_id, True)
                 await db.set_state(user_id, DONE)
 
-                msg = "✅ <b>Сиз тўлиқ дарсликни олдингиз!</b>\n\n"
-                if NEXT_BOT_LINK:
-                    msg += f"Энди навбатдаги босқичга ўтасиз 👇\n{NEXT_BOT_LINK}"
+                next_link = await handoff_to_next_bot(user_id)
+
+                msg = t("s3_finished")
+                if next_link:
+                    msg += t("s3_next_link", link=next_link)
                 else:
-                    msg += "Админ сиз билан боғланади."
+                    msg += t("s3_admin_contact")
                 return await message.answer(msg)
 
             await db.set_stage3_idx(user_id, next_idx)
@@ -299,7 +424,7 @@ async def text_handler(message: Message):
 
     except Exception:
         await admin_notify("❌ TEXT HANDLER ERROR\n" + traceback.format_exc())
-        return await message.answer("❌ Ички хато. Админга юборилди.")
+        return await message.answer(t("internal_error"))
 
 # ======================
 # CONTACT HANDLER
@@ -312,10 +437,7 @@ async def contact_handler(message: Message):
     if state == REG_PHONE:
         await db.set_user_field(user_id, "phone", message.contact.phone_number)
         await db.set_state(user_id, REG_LEVEL)
-        return await message.answer(
-            "Раҳмат ✅\n\nДаражангизни танланг:",
-            reply_markup=kb_levels()
-        )
+        return await message.answer(t("reg_ask_level"), reply_markup=kb_levels())
 
 # ======================
 # REG LEVEL
@@ -331,14 +453,13 @@ async def reg_level(call: CallbackQuery):
 
     profile = await db.get_user_profile(user_id)
 
-    text = (
-        "Маълумотларингизни текширинг:\n\n"
-        f"👤 Исм: {profile.get('full_name','')}\n"
-        f"🆔 XJ ID: {profile.get('xj_id','')}\n"
-        f"📅 Қўшилган вақт: {profile.get('join_date_text','')}\n"
-        f"📞 Телефон: {profile.get('phone','')}\n"
-        f"⭐ Даража: {profile.get('level','')}\n\n"
-        "Тасдиқлайсизми?"
+    text = t(
+        "reg_check",
+        full_name=profile.get('full_name', ''),
+        xj_id=profile.get('xj_id', ''),
+        join_date_text=profile.get('join_date_text', ''),
+        phone=profile.get('phone', ''),
+        level=profile.get('level', ''),
     )
     await call.message.answer(text, reply_markup=kb_confirm())
 
@@ -356,61 +477,57 @@ async def reg_confirm_yes(call: CallbackQuery):
 
         progress = normalize_stage2(await db.get_stage2(user_id))
 
-        return await call.message.answer(
-            "🎉 <b>Рўйхатдан муваффақиятли ўтдингиз!</b>\n\n"
-            "Энди XJ билан тўлиқ танишиб чиқамиз.",
-            reply_markup=kb_material_menu(progress)
-        )
+        return await call.message.answer(t("reg_success"), reply_markup=kb_material_menu(progress))
     except Exception as e:
         await admin_notify(f"❌ CONFIRM YES ERROR | user=<code>{user_id}</code>\n{repr(e)}")
-        return await call.message.answer(f"❌ Хато чиқди: <code>{repr(e)}</code>")
+        return await call.message.answer(t("error_details", error=repr(e)))
 
 # ======================
 # STAGE 2 MATERIALS (content/stage4)
 # ======================
 async def stage2_send_text(call: CallbackQuery):
-    path = STAGE2_DIR / "XJ_Kompaniyasi_Tanishtiruv.txt"
+    path = bots.current().stage2_dir / "XJ_Kompaniyasi_Tanishtiruv.txt"
     if not path.exists():
-        return await call.message.answer("❌ Матн файли топилмади.")
+        return await call.message.answer(t("m2_text_missing"))
     content = path.read_text(encoding="utf-8", errors="ignore")
     await call.message.answer(
-        f"📘 <b>XJ компанияси ҳақида</b>\n\n{content}",
-        reply_markup=kb_done_button("✅ Ўқидим", "m2:done:text")
+        t("m2_text", content=content),
+        reply_markup=kb_done_button(t("btn_read"), "m2:done:text")
     )
 
 async def stage2_send_audio(call: CallbackQuery):
-    path = STAGE2_DIR / "xjaudio.mp3"
+    path = bots.current().stage2_dir / "xjaudio.mp3"
     if not path.exists():
-        return await call.message.answer("❌ Аудио файли топилмади.")
+        return await call.message.answer(t("m2_audio_missing"))
     await call.message.answer_audio(
         audio=FSInputFile(path),
-        caption="🎧 <b>XJ ҳақида аудио тушунтириш</b>",
-        reply_markup=kb_done_button("✅ Тингладим", "m2:done:audio")
+        caption=t("m2_audio_caption"),
+        reply_markup=kb_done_button(t("btn_listened"), "m2:done:audio")
     )
 
 async def stage2_send_video(call: CallbackQuery):
-    path = STAGE2_DIR / "XJVIDEO.MOV"
+    path = bots.current().stage2_dir / "XJVIDEO.MOV"
     if not path.exists():
-        return await call.message.answer("❌ Видео файли топилмади.")
+        return await call.message.answer(t("m2_video_missing"))
     await call.message.answer_document(
         document=FSInputFile(path),
-        caption="🎥 <b>XJ компанияси ҳақида видео</b>",
-        reply_markup=kb_done_button("✅ Кўрдим", "m2:done:video")
+        caption=t("m2_video_caption"),
+        reply_markup=kb_done_button(t("btn_seen"), "m2:done:video")
     )
 
 async def stage2_send_links(call: CallbackQuery):
-    path = STAGE2_DIR / "xjxj_link.txt"
+    path = bots.current().stage2_dir / "xjxj_link.txt"
     if not path.exists():
-        return await call.message.answer("❌ Линклар файли топилмади.")
+        return await call.message.answer(t("m2_links_missing"))
     content = path.read_text(encoding="utf-8", errors="ignore").strip() or "—"
     await call.message.answer(
-        f"🔗 <b>Фойдали ҳаволалар:</b>\n{content}",
-        reply_markup=kb_done_button("✅ Кўрдим", "m2:done:links")
+        t("m2_links", content=content),
+        reply_markup=kb_done_button(t("btn_seen"), "m2:done:links")
     )
 
-@dp.callback_query(F.data.startswith("m2:open:"))
+# call.answer() ni SingleFlightMiddleware qiladi (t("loading"))
+@dp.callback_query(F.data.startswith("m2:open:"), flags={"single_flight": True})
 async def stage2_open(call: CallbackQuery):
-    await call.answer()
     item = call.data.split(":")[2]
 
     if item == "text":
@@ -433,11 +550,11 @@ async def stage2_done(call: CallbackQuery):
     progress = normalize_stage2(await db.get_stage2(user_id))
     rem = stage2_remaining_list(progress)
 
-    msg = "Сақланди ✅"
+    msg = t("m2_saved")
     if rem:
-        msg += "\n\n<b>Қолди:</b> " + ", ".join(rem)
+        msg += t("m2_remaining", items=", ".join(rem))
     else:
-        msg += "\n\n🎉 <b>Ҳаммаси тайёр!</b> Энди ➡️ <b>Давом этиш</b> ни босинг."
+        msg += t("m2_all_ready")
 
     await call.message.answer(msg, reply_markup=kb_material_menu(progress))
 
@@ -448,7 +565,7 @@ async def stage2_continue_locked(call: CallbackQuery):
     progress = normalize_stage2(await db.get_stage2(user_id))
     rem = stage2_remaining_list(progress)
     await call.message.answer(
-        "🔒 Ҳали ҳаммаси кўрилмаган.\n\n<b>Қолди:</b> " + ", ".join(rem),
+        t("m2_locked", items=", ".join(rem)),
         reply_markup=kb_material_menu(progress)
     )
 
@@ -461,7 +578,7 @@ async def stage2_continue(call: CallbackQuery):
         progress = normalize_stage2(await db.get_stage2(user_id))
         rem = stage2_remaining_list(progress)
         return await call.message.answer(
-            "🔒 Ҳали ҳаммаси кўрилмаган.\n\n<b>Қолди:</b> " + ", ".join(rem),
+            t("m2_locked", items=", ".join(rem)),
             reply_markup=kb_material_menu(progress)
         )
 
@@ -469,11 +586,7 @@ async def stage2_continue(call: CallbackQuery):
 
     # ✅ Q) Intro matni: "Нимани тушунсангиз, изоҳ қилиб менга ёзинг." qo‘shildi
     await call.message.answer(
-        "🎧 <b>3-босқич: Ишни бошлаш учун тўлиқ дарслик</b>\n\n"
-        "Ҳозир сизга 11 та аудио кетма-кет берилади.\n"
-        "Ҳар аудиодан кейин: <b>Нимани тушундингиз?</b> деб сўрайман.\n\n"
-        "Нимани тушунсангиз, изоҳ қилиб менга ёзинг.\n\n"
-        "Бошлаймиз ✅",
+        t("s3_intro", count=len(bots.current().stage3_audio)),
         reply_markup=kb_stage3_start()
     )
 
@@ -481,32 +594,23 @@ async def stage2_continue(call: CallbackQuery):
 # STAGE 3
 # ======================
 async def send_stage3_audio(message: Message, user_id: int, idx: int):
-    fname = STAGE3_AUDIO_FILES[idx]
-    path = STAGE3_DIR / fname
+    profile = bots.current()
+    fname = profile.stage3_audio[idx]
+    path = profile.stage3_dir / fname
 
     if not path.exists():
         await admin_notify(f"❌ 3-босқич аудио топилмади: {fname} | user={user_id}")
-        return await message.answer(
-            "❌ Аудио файл топилмади.\n\n"
-            f"Керакли файл: <code>{fname}</code>\n"
-            f"Йўл: <code>{path.as_posix()}</code>\n\n"
-            "Файл номи ва папкаси тўғрилигини текширинг."
-        )
+        return await message.answer(t("s3_audio_missing", fname=fname, path=path.as_posix()))
 
     await message.answer_audio(
         audio=FSInputFile(path),
-        caption=(
-            f"🎧 <b>{idx+1}-аудио</b>\n\n"
-            "Илтимос тинглаб бўлгач, изоҳ ёзинг:\n"
-            "<b>Нимани тушундингиз?</b>"
-        )
+        caption=t("s3_audio_caption", num=idx + 1)
     )
     await db.set_stage3_waiting(user_id, True)
     await db.set_state(user_id, STAGE3_WAIT_NOTE)
 
-@dp.callback_query(F.data == "s3:start")
+@dp.callback_query(F.data == "s3:start", flags={"single_flight": True})
 async def stage3_start(call: CallbackQuery):
-    await call.answer()
     user_id = call.from_user.id
 
     await db.set_stage3_idx(user_id, 0)
@@ -521,7 +625,7 @@ async def stage3_start(call: CallbackQuery):
 async def main():
     await on_startup()
     try:
-        await dp.start_polling(bot)
+        await dp.start_polling(*BOTS.values())
     finally:
         await on_shutdown()
 
@@ -0,0 +1,200 @@
+# middlewares.py
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import CallbackQuery, Update
+
+import bots
+import db
+import i18n
+
+
+# =========================
+# UPDATE DEDUP
+# Polling qayta ishga tushsa yoki webhook retry bo'lsa bitta update_id
+# ikki marta keladi. Handler va DB ishidan oldin takrorlarni tashlab yuboramiz.
+# =========================
+class UpdateDedupMiddleware(BaseMiddleware):
+    def __init__(self, ttl: float = 600.0, max_size: int = 10000, use_db: bool = False):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.use_db = use_db
+        self.prune_every = 1000
+        self.claim_timeout = 0.5
+        self._prune_task: asyncio.Task | None = None
+        # (bot_id, update_id) -> ko'rilgan vaqt (monotonic)
+        self._seen: OrderedDict[tuple[int, int], float] = OrderedDict()
+        self.stats = {"passed": 0, "dropped_local": 0, "dropped_db": 0}
+
+    def _evict(self, now: float):
+        while self._seen:
+            key, ts = next(iter(self._seen.items()))
+            if now - ts < self.ttl and len(self._seen) <= self.max_size:
+                break
+            self._seen.popitem(last=False)
+
+    def seen_local(self, bot_id: int, update_id: int) -> bool:
+        now = time.monotonic()
+        self._evict(now)
+        key = (bot_id, update_id)
+        if key in self._seen:
+            return True
+        self._seen[key] = now
+        return False
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        bot = data.get("bot")
+        bot_id = bot.id if bot else 0
+        update_id = event.update_id
+
+        if self.seen_local(bot_id, update_id):
+            self.stats["dropped_local"] += 1
+            return None
+
+        # Bir nechta worker bo'lsa: kim birinchi bo'lib bazada "egallasa" o'sha ishlaydi
+        if self.use_db:
+            try:
+                async with asyncio.timeout(self.claim_timeout):
+                    claimed = await db.claim_update(bot_id, update_id)
+            except Exception:
+                claimed = True  # baza sekin/ishlamasa ham update yo'qolmasin
+            if not claimed:
+                self.stats["dropped_db"] += 1
+                return None
+            # tozalash update yo'lida emas, fonda
+            if self.stats["passed"] % self.prune_every == 0 and self._prune_task is None:
+                self._prune_task = asyncio.create_task(self._prune())
+
+        self.stats["passed"] += 1
+        return await handler(event, data)
+
+    async def _prune(self):
+        try:
+            await db.prune_processed_updates(int(self.ttl))
+        except Exception:
+            pass
+        finally:
+            self._prune_task = None
+
+    def dropped(self) -> int:
+        return self.stats["dropped_local"] + self.stats["dropped_db"]
+
+
+# =========================
+# SINGLE FLIGHT (og'ir callbacklar)
+# Foydalanuvchi m2:open:video ni 5 marta bossa, bitta katta fayl 5 marta
+# yuklanmasin: (bot, user, callback_data) bo'yicha bir vaqtda faqat bittasi ishlaydi,
+# tugagandan keyin ham debounce oynasida takrorlar tashlanadi.
+# Handler flags={"single_flight": True} bilan belgilanadi.
+# =========================
+class SingleFlightMiddleware(BaseMiddleware):
+    def __init__(self, debounce: float = 5.0, toast: str | None = None):
+        self.debounce = debounce
+        self.toast = toast
+        self._inflight: set[tuple[int, int, str]] = set()
+        # (bot_id, user_id, data) -> oxirgi tugagan vaqt (monotonic)
+        self._finished: dict[tuple[int, int, str], float] = {}
+        self.stats = {"passed": 0, "coalesced": 0}
+
+    def _prune(self, now: float):
+        if len(self._finished) < 1000:
+            return
+        for key, ts in list(self._finished.items()):
+            if now - ts >= self.debounce:
+                del self._finished[key]
+
+    async def _toast(self, event: CallbackQuery):
+        # callback doim darhol javob oladi (tugmadagi "soat" aylanib qolmasin)
+        try:
+            await event.answer(self.toast or i18n.t("loading"))
+        except Exception:
+            pass
+
+    async def __call__(
+        self,
+        handler: Callable[[CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+        event: CallbackQuery,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not get_flag(data, "single_flight"):
+            return await handler(event, data)
+
+        bot = data.get("bot")
+        key = (bot.id if bot else 0, event.from_user.id, event.data or "")
+        now = time.monotonic()
+        self._prune(now)
+
+        busy = key in self._inflight
+        recent = now - self._finished.get(key, -self.debounce) < self.debounce
+
+        if busy or recent:
+            self.stats["coalesced"] += 1
+            await self._toast(event)
+            return None
+
+        # tekshiruv va band qilish orasida await bo'lmasin (parallel bosishlar)
+        self._inflight.add(key)
+        self.stats["passed"] += 1
+        try:
+            await self._toast(event)
+            return await handler(event, data)
+        finally:
+            self._inflight.discard(key)
+            self._finished[key] = time.monotonic()
+
+
+# =========================
+# TENANT (bir nechta bot bitta processda)
+# Update qaysi botdan kelgan bo'lsa, db va bot profili shu botga o'rnatiladi.
+# =========================
+class TenantMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        profile = bots.BY_ID.get(data["bot"].id)
+        if profile is None:
+            return None
+        p_token = bots.set_current(profile)
+        t_token = db.set_tenant(profile.tenant)
+        try:
+            return await handler(event, data)
+        finally:
+            db.reset_tenant(t_token)
+            bots.reset_current(p_token)
+
+
+# =========================
+# LOCALE
+# User tili (users.lang) i18n.t() va klaviaturalar uchun o'rnatiladi.
+# =========================
+class LocaleMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        lang = ""
+        if user is not None:
+            try:
+                lang = await db.get_lang(user.id)
+            except Exception:
+                lang = ""  # baza ishlamasa ham xabar standart tilda ketadi
+        token = i18n.set_lang(lang)
+        try:
+            return await handler(event, data)
+        finally:
+            i18n.reset_lang(token)
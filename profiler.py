@@ -0,0 +1,144 @@
+# profiler.py
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable
+
+# =========================
+# SAMPLING PROFILER (/profile N)
+# Alohida thread event loop threadining stekini har INTERVAL da o'qiydi.
+# Sekin callbacklar heartbeat vazifasi bilan aniqlanadi: loop SLOW_CALLBACK dan
+# uzoq bloklansa, shu paytdagi stek qayd qilinadi. asyncio debug rejimi
+# yoqilmaydi (u har Handle uchun stek oladi va loopni bir necha barobar sekinlashtiradi).
+# O'chiq paytda hech narsa ishlamaydi (overhead = 0).
+# =========================
+INTERVAL = 0.005
+HEARTBEAT = 0.01
+SLOW_CALLBACK = 0.1   # sekund: loopni shundan uzoq bloklagan callbacklar qayd qilinadi
+MAX_SECONDS = 300
+
+_task: asyncio.Task | None = None
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, target_ident: int, interval: float):
+        super().__init__(name="profiler-sampler", daemon=True)
+        self.target_ident = target_ident
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self.last_stack = ""
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_ident)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            names.reverse()
+            stack = ";".join(names)
+            self.stacks[stack] += 1
+            self.samples += 1
+            self.last_stack = stack
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+async def _heartbeat(sampler: _Sampler, slow: list[str], started: float):
+    """Loop kechikishini o'lchaydi; bloklanish bo'lsa sampler ko'rgan oxirgi stekni yozadi."""
+    loop = asyncio.get_running_loop()
+    while True:
+        t0 = loop.time()
+        await asyncio.sleep(HEARTBEAT)
+        lag = loop.time() - t0 - HEARTBEAT
+        if lag >= SLOW_CALLBACK:
+            frames = sampler.last_stack.split(";")[-5:]
+            slow.append(
+                f"+{time.perf_counter() - started:7.2f}s  blocked {lag * 1000:.0f}ms  at "
+                + " <- ".join(reversed(frames))
+            )
+
+
+def is_running() -> bool:
+    return _task is not None and not _task.done()
+
+
+def start(seconds: float, on_report: Callable[[str], Awaitable[Any]]) -> bool:
+    """Profilni fonda ishga tushiradi (sinxron: ikkinchi chaqiruv darhol False oladi).
+    Tugagach on_report(hisobot) chaqiriladi."""
+    global _task
+    if is_running():
+        return False
+
+    async def _job():
+        await on_report(await run(seconds))
+
+    _task = asyncio.create_task(_job())
+    return True
+
+
+async def run(seconds: float) -> str:
+    """seconds davomida event loopni profillaydi va matnli hisobot qaytaradi."""
+    seconds = max(1.0, min(float(seconds), MAX_SECONDS))
+
+    sampler = _Sampler(threading.get_ident(), INTERVAL)
+    slow: list[str] = []
+
+    started = time.perf_counter()
+    sampler.start()
+    beat = asyncio.create_task(_heartbeat(sampler, slow, started))
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        beat.cancel()
+        sampler.stop()
+    elapsed = time.perf_counter() - started
+
+    return _report(sampler, slow, elapsed)
+
+
+def _report(sampler: _Sampler, slow: list[str], elapsed: float, top: int = 30) -> str:
+    own: Counter[str] = Counter()
+    total: Counter[str] = Counter()
+    for stack, n in sampler.stacks.items():
+        frames = stack.split(";")
+        own[frames[-1]] += n
+        for name in set(frames):
+            total[name] += n
+
+    samples = sampler.samples or 1
+    lines = [
+        f"# profile: {elapsed:.1f}s, {sampler.samples} samples, interval {INTERVAL * 1000:.0f}ms",
+        "",
+        f"## top {top} (self)",
+    ]
+    for name, n in own.most_common(top):
+        lines.append(f"{n * 100 / samples:6.2f}%  {n:6d}  {name}")
+
+    lines += ["", f"## top {top} (total)"]
+    for name, n in total.most_common(top):
+        lines.append(f"{n * 100 / samples:6.2f}%  {n:6d}  {name}")
+
+    lines += ["", f"## slow callbacks (> {SLOW_CALLBACK * 1000:.0f}ms): {len(slow)}"]
+    lines += slow[:100]
+
+    # flamegraph.pl / speedscope uchun collapsed format
+    lines += ["", "## collapsed stacks"]
+    for stack, n in sampler.stacks.most_common():
+        lines.append(f"{stack} {n}")
+
+    return "\n".join(lines) + "\n"